@@ -1,12 +1,29 @@
 from flask import Flask, request, jsonify
 from flask_cors import CORS
 import io
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+import hashlib
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+import math
+from functools import lru_cache
+from typing import Optional
 import numpy as np
+import orjson
 import scipy.signal as signal
+from scipy.signal import resample_poly
+from scipy.fft import rfft
 import warnings
 import os
 from stream_chat import StreamChat
 import parselmouth
+import soundfile as sf
+from numba import njit, uint64
 warnings.filterwarnings('ignore')
 
 
@@ -27,28 +44,339 @@ STREAM_API_SECRET = "kpfebwva7mvhp3wwwv8cynfgeemdrf7wkrexszr8zhz4p8nj2gnjr5jy4ta
 # Initialize Stream Chat server client
 stream_client = StreamChat(api_key=STREAM_API_KEY, api_secret=STREAM_API_SECRET)
 
+# Praat analysis runs in a per-worker process pool so concurrent uploads don't
+# queue behind each other; FEATURE_WORKERS overrides the pool size. Pool
+# processes are started from a clean forkserver (spawn where unavailable), never
+# forked from a server process whose other request threads may hold locks.
+FEATURE_WORKERS = int(os.environ.get('FEATURE_WORKERS', os.cpu_count() or 1))
+# Seconds a request waits for its Praat result (kept below the 120 s Gunicorn
+# timeout); a job that overruns is treated as failed and its pool is replaced
+PRAAT_TIMEOUT = float(os.environ.get('PRAAT_TIMEOUT', 60))
+PRAAT_START_METHOD = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+_praat_executor = None
+_praat_executor_lock = threading.Lock()
+
+# Per-thread scratch arrays for the large per-request temporaries (samples,
+# windowed frame, spectra); grown to the largest clip a thread has seen, up to
+# SCRATCH_MAX_SAMPLES elements (10 s at 48 kHz). Longer clips get fresh arrays
+# that are freed with the request, so one long upload doesn't pin its memory.
+SCRATCH_MAX_SAMPLES = 480_000
+_scratch = threading.local()
+
+# Users already upserted to Stream Chat: user_id -> (name, role, expires_at),
+# oldest sync first. Re-syncing is skipped until the entry expires or the
+# name/role changes; at most STREAM_USER_CACHE_SIZE users are remembered.
+STREAM_USER_SYNC_TTL = 3600
+STREAM_USER_CACHE_SIZE = 4096
+_synced_stream_users = OrderedDict()
+_synced_stream_users_lock = threading.Lock()
+
+# Extracted features are cached on disk, keyed by FEATURE_VERSION and the SHA-256
+# of the uploaded file. Bump FEATURE_VERSION whenever a change alters extracted
+# values so entries from older code are no longer served (they are pruned on the
+# next write). At most FEATURE_CACHE_MAX_ENTRIES files are kept, least recently
+# used first out.
+FEATURE_VERSION = "4"
+FEATURE_CACHE_DIR = os.environ.get('FEATURE_CACHE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cache'))
+FEATURE_CACHE_MAX_ENTRIES = int(os.environ.get('FEATURE_CACHE_MAX_ENTRIES', 2000))
+
+# Reported for the Praat features when extraction fails
+PRAAT_FEATURE_DEFAULTS = {
+	"f0_mean": 0.0,
+	"f0_range": 0.0,
+	"jitter": 0.0,
+	"shimmer": 0.0,
+	"f1": 0.0,
+	"f2": 0.0,
+	"speech_rate": 0.0,
+}
+
+
+def _sync_stream_users(users: list[dict]) -> None:
+	"""Upsert users in Stream Chat in one batch, skipping ones synced recently with the same data."""
+	now = time.monotonic()
+	with _synced_stream_users_lock:
+		stale = [
+			user for user in users
+			if (cached := _synced_stream_users.get(user["id"])) is None
+			or cached[:2] != (user["name"], user["role"])
+			or cached[2] <= now
+		]
+	if not stale:
+		return
+	stream_client.upsert_users(stale)
+	with _synced_stream_users_lock:
+		for user in stale:
+			_synced_stream_users[user["id"]] = (user["name"], user["role"], now + STREAM_USER_SYNC_TTL)
+			_synced_stream_users.move_to_end(user["id"])
+		# Entries are in sync order, so expired ones (and any overflow) sit at the front
+		while _synced_stream_users and (
+			len(_synced_stream_users) > STREAM_USER_CACHE_SIZE
+			or next(iter(_synced_stream_users.values()))[2] <= now
+		):
+			_synced_stream_users.popitem(last=False)
+
+
+def _get_praat_executor() -> ProcessPoolExecutor:
+	"""Return this process's Praat pool, creating it on first use (after any server fork)."""
+	global _praat_executor
+	with _praat_executor_lock:
+		if _praat_executor is None:
+			_praat_executor = ProcessPoolExecutor(
+				max_workers=FEATURE_WORKERS,
+				mp_context=multiprocessing.get_context(PRAAT_START_METHOD),
+			)
+		return _praat_executor
+
+
+def _discard_praat_executor(executor: ProcessPoolExecutor) -> None:
+	"""Drop a broken or hung pool so the next request starts a fresh one.
+
+	Its processes are terminated so a hung Praat job does not keep running;
+	other jobs still in that pool fail with BrokenProcessPool.
+	"""
+	global _praat_executor
+	with _praat_executor_lock:
+		if _praat_executor is executor:
+			_praat_executor = None
+	processes = list((executor._processes or {}).values())
+	executor.shutdown(wait=False, cancel_futures=True)
+	for process in processes:
+		process.terminate()
+
+
+def _orjsonify(obj, status: int = 200):
+	"""Like jsonify, but serialized with orjson (NumPy arrays allowed)."""
+	return app.response_class(orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY), status=status, mimetype="application/json")
+
+
+def _feature_cache_path(data: bytes) -> str:
+	"""Cache file for an upload's features under the current FEATURE_VERSION."""
+	return os.path.join(FEATURE_CACHE_DIR, f"{FEATURE_VERSION}-{hashlib.sha256(data).hexdigest()}.npz")
+
+
+def _load_cached_features(path: str) -> Optional[dict]:
+	"""Return features previously stored at path, or None on a cache miss."""
+	try:
+		with np.load(path) as cached:
+			features = {key: cached[key].tolist() for key in cached.files}
+		# Refresh the mtime so pruning evicts least recently used entries first
+		os.utime(path)
+		return features
+	except FileNotFoundError:
+		return None
+	except Exception as e:
+		print(f"Warning: Ignoring unreadable feature cache {path}: {str(e)}")
+		return None
+
+
+def _store_cached_features(path: str, features: dict) -> None:
+	"""Atomically write features to path so concurrent readers never see a partial file."""
+	tmp_path = None
+	try:
+		os.makedirs(os.path.dirname(path), exist_ok=True)
+		fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+		with os.fdopen(fd, "wb") as f:
+			np.savez(f, **features)
+		os.replace(tmp_path, path)
+	except Exception as e:
+		print(f"Warning: Could not cache features: {str(e)}")
+		if tmp_path is not None:
+			try:
+				os.unlink(tmp_path)
+			except OSError:
+				pass
+		return
+	_prune_feature_cache(os.path.dirname(path))
+
+
+def _prune_feature_cache(cache_dir: str) -> None:
+	"""Delete entries from other FEATURE_VERSIONs and the least recently used ones over the cap."""
+	current_prefix = f"{FEATURE_VERSION}-"
+	entries = []
+	stale = []
+	try:
+		with os.scandir(cache_dir) as it:
+			for entry in it:
+				if not entry.name.endswith(".npz"):
+					continue
+				if entry.name.startswith(current_prefix):
+					try:
+						entries.append((entry.stat().st_mtime, entry.path))
+					except FileNotFoundError:
+						pass
+				else:
+					stale.append(entry.path)
+	except OSError as e:
+		print(f"Warning: Could not prune feature cache: {str(e)}")
+		return
+	entries.sort()
+	stale.extend(path for _, path in entries[:max(0, len(entries) - FEATURE_CACHE_MAX_ENTRIES)])
+	for path in stale:
+		try:
+			os.unlink(path)
+		except OSError:
+			# Already removed by a concurrent prune
+			pass
+
+
+def _scratch_buffer(name: str, size: int, dtype) -> np.ndarray:
+	"""Return this thread's reusable array called name, viewed to exactly size elements.
+
+	The contents are only valid until the same thread asks for name again, so
+	callers must not let the view outlive the request. Sizes over
+	SCRATCH_MAX_SAMPLES get a fresh, unpooled array.
+	"""
+	if size > SCRATCH_MAX_SAMPLES:
+		return np.empty(size, dtype=dtype)
+	buf = getattr(_scratch, name, None)
+	if buf is None or buf.size < size or buf.dtype != dtype:
+		buf = np.empty(size, dtype=dtype)
+		setattr(_scratch, name, buf)
+	return buf[:size]
+
+
+@njit(cache=True, inline="always")
+def _popcount64(w):
+	"""Number of set bits in a uint64 (branchless SWAR reduction)."""
+	w = w - ((w >> uint64(1)) & uint64(0x5555555555555555))
+	w = (w & uint64(0x3333333333333333)) + ((w >> uint64(2)) & uint64(0x3333333333333333))
+	w = (w + (w >> uint64(4))) & uint64(0x0F0F0F0F0F0F0F0F)
+	return (w * uint64(0x0101010101010101)) >> uint64(56)
+
+
+@njit(cache=True, fastmath=True)
+def _rms_zcr(x):
+	"""RMS and zero-crossing rate of a non-empty signal in a single pass.
+
+	Sign bits are packed 64 samples to a word; the crossings in a word are
+	popcount(w ^ (w << 1 | carry)), where carry is the previous sample's sign.
+	A sample counts as negative when v < 0.0, so unlike np.signbit, -0.0 is
+	treated as positive.
+	"""
+	n = x.size
+	ss = 0.0
+	zc = uint64(0)
+	carry = uint64(1) if x[0] < 0.0 else uint64(0)
+	n_words = n // 64
+	for j in range(n_words):
+		base = j * 64
+		w = uint64(0)
+		for k in range(64):
+			v = x[base + k]
+			ss += v * v
+			w |= uint64(v < 0.0) << uint64(k)
+		zc += _popcount64(w ^ ((w << uint64(1)) | carry))
+		carry = w >> uint64(63)
+	for i in range(n_words * 64, n):
+		v = x[i]
+		ss += v * v
+		bit = uint64(1) if v < 0.0 else uint64(0)
+		zc += bit ^ carry
+		carry = bit
+	zcr = int(zc) / (n - 1) if n > 1 else 0.0
+	return math.sqrt(ss / n), zcr
+
+
+@njit(cache=True, fastmath=True)
+def _spec_stats(freqs, psd):
+	"""Sum, frequency-weighted sum and log-sum of a floored PSD in a single pass."""
+	s = 0.0
+	sf = 0.0
+	sl = 0.0
+	for i in range(psd.size):
+		p = max(psd[i], 1e-20)  # avoid log(0)
+		s += p
+		sf += freqs[i] * p
+		sl += math.log(p)
+	return s, sf, sl
+
+
+def _hann(n: int) -> np.ndarray:
+	"""Periodic Hann window of length n (same window periodogram uses).
+
+	Windows up to SCRATCH_MAX_SAMPLES long are cached; longer ones are built
+	per call so a few long uploads can't pin full-length windows.
+	"""
+	if n > SCRATCH_MAX_SAMPLES:
+		return _build_hann(n)
+	return _cached_hann(n)
+
+
+def _build_hann(n: int) -> np.ndarray:
+	"""Read-only float32 Hann window of length n."""
+	w = signal.get_window("hann", n).astype(np.float32)
+	w.setflags(write=False)
+	return w
+
+
+_cached_hann = lru_cache(maxsize=8)(_build_hann)
+
+
+def _rfftfreq(n: int, sample_rate: int) -> np.ndarray:
+	"""One-sided frequency axis for an n-point rfft, cached like _hann."""
+	if n > SCRATCH_MAX_SAMPLES:
+		return _build_rfftfreq(n, sample_rate)
+	return _cached_rfftfreq(n, sample_rate)
+
+
+def _build_rfftfreq(n: int, sample_rate: int) -> np.ndarray:
+	"""Read-only rfftfreq axis for an n-point rfft."""
+	freqs = np.fft.rfftfreq(n, 1.0 / sample_rate)
+	freqs.setflags(write=False)
+	return freqs
+
+
+_cached_rfftfreq = lru_cache(maxsize=8)(_build_rfftfreq)
+
+
+@lru_cache(maxsize=32)
+def _mfcc_bands(n: int, num_coeffs: int) -> tuple[np.ndarray, np.ndarray]:
+	"""Band start indices and 1/width for averaging n bins into num_coeffs bands.
+
+	Empty bands get a weight of 0 so their reduceat value (a single bin) drops out.
+	"""
+	edges = (np.arange(num_coeffs + 1) * n // num_coeffs).astype(np.intp)
+	widths = np.diff(edges)
+	inv_widths = np.divide(1.0, widths, out=np.zeros(num_coeffs), where=widths > 0)
+	starts = edges[:-1]
+	starts.setflags(write=False)
+	inv_widths.setflags(write=False)
+	return starts, inv_widths
+
 
 def compute_basic_features(samples: np.ndarray, sample_rate: int) -> dict:
 	"""Compute RMS, ZCR, Spectral Centroid, Spectral Flatness from mono PCM samples."""
-	# Ensure float64 for calculations
-	x = samples.astype(np.float64)
-	# RMS
-	rms = float(np.sqrt(np.mean(np.square(x)))) if x.size > 0 else 0.0
-	# ZCR
-	zero_crossings = np.sum(np.abs(np.diff(np.signbit(x))))
-	zcr = float(zero_crossings) / float(x.size - 1) if x.size > 1 else 0.0
-	# Power spectrum for spectral features
+	# Work in the input precision (float32 from the decoder); 16-bit audio needs
+	# no more, and the reductions below touch half the bytes of a float64 copy
+	x = samples
 	if x.size == 0:
 		return {"rms": 0.0, "zcr": 0.0, "spectralCentroid": 0.0, "spectralFlatness": 0.0}
-	# Use periodogram for stable estimate
-	freqs, psd = signal.periodogram(x, fs=sample_rate, scaling="spectrum", window="hann")
-	psd = np.maximum(psd, 1e-20)  # avoid log(0)
+	# RMS and ZCR in one fused pass
+	rms, zcr = _rms_zcr(x)
+	# Power spectrum for spectral features: Hann-windowed (equivalent to
+	# periodogram with scaling="spectrum"), reusing the cached window and axis.
+	# No zero-padding: it would interpolate the spectrum and make flatness
+	# depend on clip length.
+	n_fft = x.size
+	w = _hann(x.size)
+	frame = _scratch_buffer("frame", x.size, np.float32)
+	np.subtract(x, x.mean(), out=frame)
+	frame *= w
+	spec = rfft(frame, n=n_fft, workers=-1)
+	psd = np.abs(spec, out=_scratch_buffer("psd", spec.size, np.float32))
+	np.square(psd, out=psd)
+	psd /= np.square(w.sum())
+	# One-sided: double everything except DC (and Nyquist for even lengths)
+	psd[1:n_fft - n_fft // 2] *= 2.0
+	freqs = _rfftfreq(n_fft, sample_rate)
+	psd_sum, weighted_sum, log_sum = _spec_stats(freqs, psd)
 	# Spectral centroid
-	centroid = float(np.sum(freqs * psd) / np.sum(psd)) if np.sum(psd) > 0 else 0.0
+	centroid = weighted_sum / psd_sum if psd_sum > 0 else 0.0
 	# Spectral flatness (geometric mean / arithmetic mean)
-	geom_mean = float(np.exp(np.mean(np.log(psd))))
-	arith_mean = float(np.mean(psd)) if psd.size > 0 else 0.0
-	flatness = float(geom_mean / arith_mean) if arith_mean > 0 else 0.0
+	geom_mean = math.exp(log_sum / psd.size)
+	arith_mean = psd_sum / psd.size
+	flatness = geom_mean / arith_mean if arith_mean > 0 else 0.0
 	return {
 		"rms": rms,
 		"zcr": zcr,
@@ -57,112 +385,94 @@ def compute_basic_features(samples: np.ndarray, sample_rate: int) -> dict:
 	}
 
 
-def extract_praat_features(samples: np.ndarray, sample_rate: int) -> dict:
-	"""Extract advanced voice features using Praat/Parselmouth."""
+# Pitch (50-600 Hz) needs nothing near the top of the spectrum, so it is tracked
+# on a copy decimated by an integer factor to roughly this rate
+PITCH_ANALYSIS_RATE = 8000
+
+# All Praat analyses run as one script, so the sound is marshalled into Praat
+# once and every per-frame loop stays inside Praat. Arguments mirror
+# Sound.to_pitch_ac / to_formant_burg defaults with the settings below.
+# Expects the full-rate sound and the pitch-analysis sound selected, in that order.
+PRAAT_FEATURES_SCRIPT = """
+sound = selected("Sound", 1)
+pitch_sound = selected("Sound", 2)
+selectObject: sound
+duration = Get total duration
+
+selectObject: pitch_sound
+pitch = To Pitch (ac): 0.01, 50, 15, "no", 0.03, 0.45, 0.01, 0.35, 0.14, 600
+voiced_frames = Count voiced frames
+f0_mean = Get mean: 0, 0, "Hertz"
+f0_min = Get minimum: 0, 0, "Hertz", "none"
+f0_max = Get maximum: 0, 0, "Hertz", "none"
+
+selectObject: sound
+To Formant (burg): 0.01, 5, 5500, 0.025, 50
+f1_mean = Get mean: 1, 0, 0, "hertz"
+f2_mean = Get mean: 2, 0, 0, "hertz"
+
+selectObject: sound
+point_process = To PointProcess (periodic, cc): 50, 600
+n_pulses = Get number of points
+jitter = undefined
+shimmer = undefined
+if n_pulses > 1
+	jitter = Get jitter (local): 0, duration, 0.0001, 0.02, 1.3
+	selectObject: sound, point_process
+	shimmer = Get shimmer (local): 0, duration, 0.0001, 0.02, 1.3, 1.6
+endif
+"""
+
+
+def extract_praat_features(samples: np.ndarray, sample_rate: int) -> Optional[dict]:
+	"""Extract advanced voice features using Praat/Parselmouth.
+
+	samples may be float audio in [-1, 1) or raw int16 PCM. Returns None if
+	the Praat analysis fails.
+	"""
 	try:
-		# Create Praat Sound object from numpy array
+		# Create Praat Sound object from numpy array; Praat stores float64, so
+		# int16 PCM is scaled straight into that buffer
+		if samples.dtype == np.int16:
+			samples = np.multiply(samples, 1.0 / 32768.0)
 		sound = parselmouth.Sound(samples, sampling_frequency=sample_rate)
-		duration = sound.duration
 		
-		# Extract Pitch (F0)
-		pitch = sound.to_pitch_ac(
-			time_step=0.01,
-			pitch_floor=50.0,
-			pitch_ceiling=600.0
-		)
-		
-		# Get F0 statistics
-		f0_values = []
-		f0_mean = 0.0
-		f0_std = 0.0
-		f0_min = 0.0
-		f0_max = 0.0
-		f0_range = 0.0
-		
-		if pitch:
-			# Extract F0 values (excluding unvoiced frames)
-			for t in np.arange(0, duration, 0.01):
-				f0 = pitch.get_value_at_time(t)
-				if f0 is not None and f0 > 0:
-					f0_values.append(f0)
-			
-			if len(f0_values) > 0:
-				f0_array = np.array(f0_values)
-				f0_mean = float(np.mean(f0_array))
-				f0_std = float(np.std(f0_array))
-				f0_min = float(np.min(f0_array))
-				f0_max = float(np.max(f0_array))
-				f0_range = f0_max - f0_min
-			else:
-				f0_mean = 0.0
-				f0_range = 0.0
+		# Decimate for the pitch tracker only: Burg formant analysis already
+		# resamples to 2 x 5500 Hz internally, and jitter/shimmer depend on the
+		# waveform shape, so both keep the full-rate sound
+		factor = int(sample_rate // PITCH_ANALYSIS_RATE)
+		if factor >= 2:
+			pitch_sound = parselmouth.Sound(resample_poly(samples, 1, factor), sampling_frequency=sample_rate / factor)
 		else:
-			f0_mean = 0.0
-			f0_range = 0.0
+			pitch_sound = sound
 		
-		# Extract Formants (F1, F2)
-		formant = sound.to_formant_burg(
-			time_step=0.01,
-			max_number_of_formants=5.0,
-			maximum_formant=5500.0
-		)
+		# Pitch (F0), formants (F1, F2) and jitter/shimmer in a single Praat call
+		_, praat_vars = parselmouth.praat.run([sound, pitch_sound], PRAAT_FEATURES_SCRIPT, return_variables=True)
 		
-		f1_values = []
-		f2_values = []
-		f1_mean = 0.0
-		f2_mean = 0.0
+		def value(name: str) -> float:
+			# Praat reports --undefined-- (no voiced frames, too few pulses) as NaN
+			v = float(praat_vars[name])
+			return 0.0 if math.isnan(v) else v
 		
-		if formant:
-			for t in np.arange(0, duration, 0.01):
-				f1 = formant.get_value_at_time(formant_number=1, time=t)
-				f2 = formant.get_value_at_time(formant_number=2, time=t)
-				if f1 is not None and f1 > 0:
-					f1_values.append(f1)
-				if f2 is not None and f2 > 0:
-					f2_values.append(f2)
-			
-			if len(f1_values) > 0:
-				f1_mean = float(np.mean(f1_values))
-			if len(f2_values) > 0:
-				f2_mean = float(np.mean(f2_values))
+		duration = value("duration")
+		voiced_frames = int(value("voiced_frames"))
 		
-		# Extract PointProcess (pulses) for jitter and shimmer
-		point_process = None
-		jitter = 0.0
-		shimmer = 0.0
+		# F0 statistics over voiced frames
+		f0_mean = value("f0_mean")
+		f0_range = value("f0_max") - value("f0_min")
 		
-		try:
-			# Create PointProcess using Praat script
-			point_process = parselmouth.praat.call(sound, "To PointProcess (periodic, cc)", 50.0, 600.0)
-			
-			if point_process:
-				n_pulses = parselmouth.praat.call(point_process, "Get number of points")
-				
-				# Calculate Jitter (local, absolute)
-				if n_pulses > 1:
-					try:
-						jitter = parselmouth.praat.call(point_process, "Get jitter (local)", 0.0, duration, 0.0001, 0.02, 1.3)
-						jitter = float(jitter * 100.0)  # Convert to percentage
-					except:
-						jitter = 0.0
-					
-					# Calculate Shimmer (local, relative)
-					try:
-						shimmer = parselmouth.praat.call([sound, point_process], "Get shimmer (local)", 0.0, duration, 0.0001, 0.02, 1.3, 1.6)
-						shimmer = float(shimmer * 100.0)  # Convert to percentage
-					except:
-						shimmer = 0.0
-		except Exception as e:
-			print(f"Warning: Could not extract jitter/shimmer: {str(e)}")
-			jitter = 0.0
-			shimmer = 0.0
+		f1_mean = value("f1_mean")
+		f2_mean = value("f2_mean")
+		
+		# Jitter (local) and shimmer (local) as percentages
+		jitter = value("jitter") * 100.0
+		shimmer = value("shimmer") * 100.0
 		
 		# Estimate speech rate (rough estimate based on voiced segments)
 		speech_rate = 0.0
-		if len(f0_values) > 0:
+		if voiced_frames > 0:
 			# Estimate based on voiced frames and duration
 			# Rough approximation: assume average word length
-			voiced_frames = len(f0_values)
 			voiced_duration = voiced_frames * 0.01
 			# Estimate words per minute (rough heuristic)
 			words_estimate = voiced_duration / 0.5  # Assume ~0.5 seconds per word average
@@ -181,37 +491,29 @@ def extract_praat_features(samples: np.ndarray, sample_rate: int) -> dict:
 		}
 	except Exception as e:
 		print(f"Error in Praat extraction: {str(e)}")
-		# Return defaults if Praat extraction fails
-		return {
-			"f0_mean": 0.0,
-			"f0_range": 0.0,
-			"jitter": 0.0,
-			"shimmer": 0.0,
-			"f1": 0.0,
-			"f2": 0.0,
-			"speech_rate": 0.0,
-		}
+		return None
 
 
-def compute_mfcc(samples: np.ndarray, sample_rate: int, num_coeffs: int = 13) -> list[float]:
-	"""Compute MFCCs using scipy FFT and mel filterbank."""
+def compute_mfcc(samples: np.ndarray, sample_rate: int, num_coeffs: int = 13) -> Optional[np.ndarray]:
+	"""Compute MFCCs using scipy FFT and mel filterbank; None if the computation fails."""
 	try:
 		# Simple MFCC-like features using FFT and mel-scale approximation
-		fft = np.fft.fft(samples)
-		magnitude = np.abs(fft[:len(fft)//2])
+		# Input is real PCM, so the one-sided rfft is all we need. It runs at
+		# the exact length: zero-padding would resample the spectrum and make
+		# the bands depend on clip length. Keep the first n // 2 bins, as the
+		# full-FFT version did.
+		n = len(samples)
+		spec = rfft(np.asarray(samples, dtype=np.float32), workers=-1)[:n // 2]
+		magnitude = np.abs(spec, out=_scratch_buffer("magnitude", spec.size, np.float32))
 		
-		# Simple mel-like filterbank approximation
-		mfccs = []
-		for i in range(num_coeffs):
-			start = int((i * len(magnitude)) / num_coeffs)
-			end = int(((i + 1) * len(magnitude)) / num_coeffs)
-			coeff = float(np.mean(magnitude[start:end])) if end > start else 0.0
-			mfccs.append(coeff)
+		# Simple mel-like filterbank approximation: average contiguous bands
+		# in one reduceat pass instead of a Python loop of np.mean calls
+		starts, inv_widths = _mfcc_bands(len(magnitude), num_coeffs)
+		mfccs = np.add.reduceat(magnitude, starts) * inv_widths
 		
 		return mfccs
 	except:
-		# Fallback to zeros if computation fails
-		return [0.0] * num_coeffs
+		return None
 
 
 @app.route("/health", methods=["GET"])  # simple health check
@@ -233,11 +535,11 @@ def generate_stream_token():
 		# Create or update user in Stream Chat with proper role
 		# Give teachers (ID 9999) admin role so they can create channels
 		role = "admin" if userId == "9999" else "user"
-		stream_client.update_user({
+		_sync_stream_users([{
 			"id": userId,
 			"name": userName,
 			"role": role,
-		})
+		}])
 		
 		# Generate JWT token
 		token = stream_client.create_token(userId)
@@ -267,9 +569,11 @@ def create_stream_channel():
 		
 		channel_id = f"teacher-{teacher_id}-student-{student_id}"
 		
-		# Ensure both users exist
-		stream_client.update_user({"id": teacher_id, "name": f"Teacher {teacher_id}", "role": "admin"})
-		stream_client.update_user({"id": student_id, "name": f"Student {student_id}"})
+		# Ensure both users exist (one batched request, skipped if already synced)
+		_sync_stream_users([
+			{"id": teacher_id, "name": f"Teacher {teacher_id}", "role": "admin"},
+			{"id": student_id, "name": f"Student {student_id}", "role": "user"},
+		])
 		
 		# Create channel server-side with admin permissions
 		channel = stream_client.channel("messaging", channel_id, {
@@ -297,51 +601,88 @@ def create_stream_channel():
 def extract_features():
 	"""Accept a WAV file and return features computed with Praat/Parselmouth."""
 	if "file" not in request.files:
-		return jsonify({"error": "file field missing"}), 400
+		return _orjsonify({"error": "file field missing"}, 400)
 	file = request.files["file"]
 	data = file.read()
 	if not data:
-		return jsonify({"error": "empty file"}), 400
+		return _orjsonify({"error": "empty file"}, 400)
+	# Re-uploads of the same clip (UI retries, teacher review) skip the analysis
+	cache_path = _feature_cache_path(data)
+	cached = _load_cached_features(cache_path)
+	if cached is not None:
+		return _orjsonify(cached)
 	try:
-		# Simple WAV file reading (assumes 16-bit PCM, mono)
-		# Skip WAV header (44 bytes) and read audio data
-		audio_data = data[44:]
-		samples = np.frombuffer(audio_data, dtype=np.int16).astype(np.float32) / 32768.0
-		sample_rate = 16000  # Assuming 16kHz as per our conversion
+		# libsndfile handles arbitrary header chunks. 16-bit PCM decodes to
+		# int16 without any conversion; everything else (float, 24/32-bit PCM,
+		# compressed formats) is decoded to float32, since libsndfile does not
+		# rescale float data read as int16.
+		with sf.SoundFile(io.BytesIO(data)) as audio_file:
+			sample_rate = audio_file.samplerate
+			is_pcm16 = audio_file.subtype == "PCM_16"
+			audio = audio_file.read(dtype="int16" if is_pcm16 else "float32")
+	except RuntimeError as e:
+		# libsndfile's message names the in-memory buffer; keep it server-side
+		print(f"Warning: Could not decode upload: {str(e)}")
+		return _orjsonify({"error": "unsupported audio file"}, 400)
+	try:
+		if audio.ndim > 1:
+			if is_pcm16:
+				audio = (audio.sum(axis=1, dtype=np.int32) // audio.shape[1]).astype(np.int16)
+			else:
+				audio = audio.mean(axis=1, dtype=np.float32)
+		
+		# Start the advanced Praat features (F0, jitter, shimmer, formants) in
+		# the process pool; they dominate the request, so overlap them with
+		# the cheap in-process NumPy features below. For 16-bit input Praat
+		# gets the int16 PCM (half the bytes to ship) and does its own float64
+		# conversion.
+		executor = _get_praat_executor()
+		praat_future = executor.submit(extract_praat_features, audio, sample_rate)
+		
+		# Only the NumPy features need float32; convert and scale in one pass
+		if is_pcm16:
+			samples = np.multiply(audio, np.float32(1.0 / 32768.0), out=_scratch_buffer("samples", audio.size, np.float32))
+		else:
+			samples = audio
 		
 		# Compute basic features (RMS, ZCR, Spectral features, MFCC)
 		basic = compute_basic_features(samples, sample_rate)
 		mfcc = compute_mfcc(samples, sample_rate, num_coeffs=13)
+		# Results built from fallbacks are returned but never cached
+		degraded = False
+		if mfcc is None:
+			mfcc = np.zeros(13)
+			degraded = True
 		
-		# Extract advanced Praat features (F0, jitter, shimmer, formants)
-		praat_features = extract_praat_features(samples, sample_rate)
+		try:
+			praat_features = praat_future.result(timeout=PRAAT_TIMEOUT)
+		except (BrokenProcessPool, FutureTimeoutError) as e:
+			# A pool process died (most likely Praat crashing or running out of
+			# memory on this upload) or hung. Don't retry in the web worker,
+			# where the same crash would take down its other requests; report
+			# defaults and start a fresh pool next time.
+			print(f"Warning: Praat extraction failed ({type(e).__name__}); using defaults")
+			_discard_praat_executor(executor)
+			praat_features = None
+		if praat_features is None:
+			praat_features = PRAAT_FEATURE_DEFAULTS
+			degraded = True
 		
-		# Print extracted features to terminal/console
-		print("\n" + "="*50)
-		print("PRAAT EXTRACTED FEATURES")
-		print("="*50)
-		print("Basic Features:")
-		print(f"  RMS (energy/loudness): {basic['rms']:.6f}")
-		print(f"  ZCR (noise/sibilance): {basic['zcr']:.6f}")
-		print(f"  Spectral Centroid (brightness): {basic['spectralCentroid']:.2f} Hz")
-		print(f"  Spectral Flatness (tonality): {basic['spectralFlatness']:.6f}")
-		print(f"  MFCCs: {mfcc[:5]}... (first 5 of 13)")
-		print("\nPraat Advanced Features:")
-		print(f"  F0 Mean (pitch): {praat_features['f0_mean']:.2f} Hz")
-		print(f"  F0 Range: {praat_features['f0_range']:.2f} Hz")
-		print(f"  Jitter: {praat_features['jitter']:.2f}%")
-		print(f"  Shimmer: {praat_features['shimmer']:.2f}%")
-		print(f"  F1 (First Formant): {praat_features['f1']:.2f} Hz")
-		print(f"  F2 (Second Formant): {praat_features['f2']:.2f} Hz")
-		print(f"  Speech Rate: {praat_features['speech_rate']:.1f} WPM")
-		print(f"\nAudio Info:")
-		print(f"  Sample Rate: {sample_rate} Hz")
-		print(f"  Number of Samples: {len(samples)}")
-		print(f"  Duration: {len(samples) / sample_rate:.2f} seconds")
-		print("="*50 + "\n")
+		# Log extracted features (Flask enables DEBUG on app.logger in debug mode);
+		# the level check skips building the arguments in production
+		if app.logger.isEnabledFor(logging.DEBUG):
+			app.logger.debug(
+				"Extracted features: rms=%.6f zcr=%.6f centroid=%.2fHz flatness=%.6f mfcc[:5]=%s "
+				"f0_mean=%.2fHz f0_range=%.2fHz jitter=%.2f%% shimmer=%.2f%% f1=%.2fHz f2=%.2fHz "
+				"speech_rate=%.1fWPM sample_rate=%dHz samples=%d duration=%.2fs",
+				basic["rms"], basic["zcr"], basic["spectralCentroid"], basic["spectralFlatness"], mfcc[:5],
+				praat_features["f0_mean"], praat_features["f0_range"], praat_features["jitter"],
+				praat_features["shimmer"], praat_features["f1"], praat_features["f2"],
+				praat_features["speech_rate"], sample_rate, len(samples), len(samples) / sample_rate,
+			)
 		
 		# Return combined features
-		return jsonify({
+		features = {
 			# Basic features
 			"rms": basic["rms"],
 			"zcr": basic["zcr"],
@@ -356,12 +697,15 @@ def extract_features():
 			"f1": praat_features["f1"],
 			"f2": praat_features["f2"],
 			"speech_rate": praat_features["speech_rate"],
-		})
+		}
+		if not degraded:
+			_store_cached_features(cache_path, features)
+		return _orjsonify(features)
 	except Exception as e:
 		print(f"Error in extract_features: {str(e)}")
 		import traceback
 		traceback.print_exc()
-		return jsonify({"error": str(e)}), 500
+		return _orjsonify({"error": str(e)}, 500)
 
 
 if __name__ == "__main__":
@@ -369,4 +713,5 @@ if __name__ == "__main__":
 	import os
 	os.environ['FLASK_SKIP_DOTENV'] = '1'
 	
-	app.run(host="0.0.0.0", port=8000, debug=True)
\ No newline at end of file
+	# Development server only; use gunicorn (see gunicorn.conf.py) in production
+	app.run(host="0.0.0.0", port=8000, debug=os.environ.get('FLASK_DEBUG', '').lower() in ('1', 'true'))
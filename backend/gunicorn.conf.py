@@ -0,0 +1,29 @@
+# Gunicorn configuration for the voice analysis backend.
+# Usage (from the backend directory): gunicorn app:app
+import multiprocessing
+import os
+
+bind = os.environ.get("BIND", "0.0.0.0:8000")
+
+# One worker process per CPU, each serving several requests concurrently so
+# uploads and Stream Chat calls overlap instead of queueing
+workers = int(os.environ.get("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+worker_class = "gthread"
+threads = int(os.environ.get("GUNICORN_THREADS", 4))
+
+# Feature extraction can take a while on long recordings
+timeout = 120
+
+
+def post_fork(server, worker):
+	"""Size each worker's Praat pool before it starts serving requests.
+
+	Every worker already gets its own CPU, so give each one a single Praat
+	process rather than a pool per CPU, unless FEATURE_WORKERS is set
+	explicitly. The pool is created lazily on the first request, so setting
+	the module attribute here works with and without --preload.
+	"""
+	import app
+
+	if "FEATURE_WORKERS" not in os.environ:
+		app.FEATURE_WORKERS = 1
@@ -0,0 +1,188 @@
+"""Regression tests for the feature-extraction backend (run from backend/: python -m pytest)."""
+import hashlib
+import io
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+import pytest
+import scipy.signal as signal
+import soundfile as sf
+
+import app as backend
+
+
+SAMPLE_RATE = 16000
+
+
+def _sine_wav(subtype: str, channels: int = 1) -> bytes:
+	"""Two seconds of a 150 Hz sine at half scale, encoded as a WAV of the given subtype."""
+	t = np.arange(2 * SAMPLE_RATE) / SAMPLE_RATE
+	x = 0.5 * np.sin(2 * np.pi * 150.0 * t)
+	if channels > 1:
+		x = np.stack([x] * channels, axis=1)
+	buf = io.BytesIO()
+	sf.write(buf, x, SAMPLE_RATE, format="WAV", subtype=subtype)
+	return buf.getvalue()
+
+
+def _post(client, data: bytes):
+	return client.post("/extract_features", data={"file": (io.BytesIO(data), "clip.wav")})
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+	monkeypatch.setattr(backend, "FEATURE_CACHE_DIR", str(tmp_path))
+	return backend.app.test_client()
+
+
+@pytest.mark.parametrize("subtype,channels", [
+	("PCM_16", 1),
+	("PCM_24", 1),
+	("FLOAT", 1),
+	("FLOAT", 2),
+])
+def test_extract_features_decodes_wav_subtypes(client, subtype, channels):
+	res = _post(client, _sine_wav(subtype, channels))
+	assert res.status_code == 200
+	features = res.get_json()
+	# RMS of a 0.5-amplitude sine is 0.5 / sqrt(2)
+	assert features["rms"] == pytest.approx(0.5 / np.sqrt(2), rel=1e-3)
+	assert features["f0_mean"] == pytest.approx(150.0, abs=1.0)
+	assert max(features["mfcc"]) > 0.0
+
+
+def test_feature_cache_is_keyed_by_version_and_content(client, tmp_path):
+	data = _sine_wav("PCM_16")
+	first = _post(client, data).get_json()
+	expected = f"{backend.FEATURE_VERSION}-{hashlib.sha256(data).hexdigest()}.npz"
+	assert [p.name for p in tmp_path.glob("*.npz")] == [expected]
+	assert _post(client, data).get_json() == first
+
+
+def test_degraded_features_are_not_cached(client, tmp_path, monkeypatch):
+	monkeypatch.setattr(backend, "compute_mfcc", lambda *args, **kwargs: None)
+	res = _post(client, _sine_wav("PCM_16"))
+	assert res.status_code == 200
+	assert res.get_json()["mfcc"] == [0.0] * 13
+	assert not list(tmp_path.glob("*.npz"))
+
+
+def test_feature_cache_prunes_old_versions_and_excess_entries(client, tmp_path, monkeypatch):
+	monkeypatch.setattr(backend, "FEATURE_CACHE_MAX_ENTRIES", 2)
+	(tmp_path / "old-version.npz").write_bytes(b"")
+	for i in range(3):
+		data = _sine_wav("PCM_16")
+		# Change one sample so every upload has a distinct hash
+		data = data[:-2] + i.to_bytes(2, "little")
+		assert _post(client, data).status_code == 200
+	names = sorted(p.name for p in tmp_path.glob("*.npz"))
+	assert len(names) == 2
+	assert all(name.startswith(f"{backend.FEATURE_VERSION}-") for name in names)
+
+
+def test_stream_user_sync_skips_repeats_and_stays_bounded(monkeypatch):
+	calls = []
+	monkeypatch.setattr(backend.stream_client, "upsert_users", lambda users: calls.append([u["id"] for u in users]))
+	monkeypatch.setattr(backend, "_synced_stream_users", backend.OrderedDict())
+	monkeypatch.setattr(backend, "STREAM_USER_CACHE_SIZE", 2)
+
+	backend._sync_stream_users([{"id": "1", "name": "A", "role": "user"}])
+	backend._sync_stream_users([{"id": "1", "name": "A", "role": "user"}])
+	assert calls == [["1"]]
+
+	backend._sync_stream_users([
+		{"id": "2", "name": "B", "role": "user"},
+		{"id": "3", "name": "C", "role": "admin"},
+	])
+	assert calls == [["1"], ["2", "3"]]
+	assert list(backend._synced_stream_users) == ["2", "3"]
+
+
+@pytest.mark.parametrize("n", [16001, 48000, 160007])
+def test_compute_mfcc_matches_full_fft_bands(n):
+	rng = np.random.default_rng(n)
+	x = rng.standard_normal(n).astype(np.float32)
+	magnitude = np.abs(np.fft.fft(x.astype(np.float64))[:n // 2])
+	edges = [i * magnitude.size // 13 for i in range(14)]
+	expected = [magnitude[a:b].mean() for a, b in zip(edges, edges[1:])]
+	np.testing.assert_allclose(backend.compute_mfcc(x, SAMPLE_RATE), expected, rtol=1e-4)
+
+
+@pytest.mark.parametrize("n", [16001, 48000, 160007])
+def test_spectral_features_match_periodogram(n):
+	rng = np.random.default_rng(n)
+	x = rng.standard_normal(n).astype(np.float32)
+	freqs, psd = signal.periodogram(x.astype(np.float64), fs=SAMPLE_RATE, scaling="spectrum", window="hann")
+	psd = np.maximum(psd, 1e-20)
+	features = backend.compute_basic_features(x, SAMPLE_RATE)
+	assert features["spectralCentroid"] == pytest.approx(np.sum(freqs * psd) / np.sum(psd), rel=1e-4)
+	assert features["spectralFlatness"] == pytest.approx(np.exp(np.mean(np.log(psd))) / np.mean(psd), rel=1e-3)
+
+
+class _FailingExecutor:
+	"""Stands in for the Praat pool; its jobs hang or fail as a broken pool."""
+
+	def __init__(self, broken: bool):
+		self.broken = broken
+
+	def submit(self, fn, *args):
+		future = Future()
+		if self.broken:
+			future.set_exception(BrokenProcessPool())
+		return future
+
+
+@pytest.mark.parametrize("broken", [True, False])
+def test_failed_praat_job_reports_defaults_without_retrying(client, tmp_path, monkeypatch, broken):
+	executor = _FailingExecutor(broken)
+	discarded = []
+	monkeypatch.setattr(backend, "PRAAT_TIMEOUT", 0.1)
+	monkeypatch.setattr(backend, "_get_praat_executor", lambda: executor)
+	monkeypatch.setattr(backend, "_discard_praat_executor", discarded.append)
+	monkeypatch.setattr(backend, "extract_praat_features", lambda *args: pytest.fail("Praat rerun in-process"))
+	res = _post(client, _sine_wav("PCM_16"))
+	assert res.status_code == 200
+	features = res.get_json()
+	assert {key: features[key] for key in backend.PRAAT_FEATURE_DEFAULTS} == backend.PRAAT_FEATURE_DEFAULTS
+	assert discarded == [executor]
+	assert not list(tmp_path.glob("*.npz"))
+
+
+def test_scratch_buffers_are_pooled_only_below_the_cap(monkeypatch):
+	monkeypatch.setattr(backend, "_scratch", backend.threading.local())
+	monkeypatch.setattr(backend, "SCRATCH_MAX_SAMPLES", 100)
+	small = backend._scratch_buffer("frame", 100, np.float32)
+	assert np.shares_memory(small, backend._scratch_buffer("frame", 50, np.float32))
+	large = backend._scratch_buffer("frame", 101, np.float32)
+	assert not np.shares_memory(large, backend._scratch_buffer("frame", 101, np.float32))
+	assert backend._scratch.frame.size == 100
+
+
+def test_window_caches_skip_long_clips(monkeypatch):
+	monkeypatch.setattr(backend, "SCRATCH_MAX_SAMPLES", 100)
+	backend._cached_hann.cache_clear()
+	backend._cached_rfftfreq.cache_clear()
+	assert backend._hann(100) is backend._hann(100)
+	assert backend._hann(101) is not backend._hann(101)
+	assert backend._rfftfreq(101, SAMPLE_RATE) is not backend._rfftfreq(101, SAMPLE_RATE)
+	assert backend._cached_hann.cache_info().currsize == 1
+	assert backend._cached_rfftfreq.cache_info().currsize == 0
+
+
+@pytest.mark.parametrize("n", [1, 2, 63, 64, 65, 127, 128, 129, 160003])
+def test_rms_zcr_matches_numpy(n):
+	rng = np.random.default_rng(n)
+	x = rng.standard_normal(n).astype(np.float32)
+	# Exact zeros count as non-negative, as with np.signbit
+	x[::7] = 0.0
+	rms, zcr = backend._rms_zcr(x)
+	assert rms == pytest.approx(np.sqrt(np.mean(np.square(x, dtype=np.float64))), rel=1e-5)
+	expected_zc = np.count_nonzero(np.diff(np.signbit(x)))
+	assert zcr == pytest.approx(expected_zc / (n - 1) if n > 1 else 0.0)
+
+
+def test_undecodable_upload_gets_a_generic_error(client):
+	res = _post(client, b"not audio at all")
+	assert res.status_code == 400
+	assert res.get_json() == {"error": "unsupported audio file"}